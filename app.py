@@ -5,8 +5,14 @@ Gradio is a Python library that creates web UIs for ML models.
 Think of it like Blazor, but specifically designed for AI demos.
 """
 
+import queue  # Thread-safe queue (like BlockingCollection<T> in C#)
+import time
+from collections.abc import Iterator  # Type hint for generators (like IEnumerable<T>)
+from threading import Thread
+
 import gradio as gr  # 'as gr' creates an alias (like 'using gr = Gradio;')
 
+import config  # App settings (examples, batch size, session pool size, queue limits)
 import chat_service  # Our business logic module
 import chat_repository  # NEW: Data access for loading/saving chat history
 from database import init_db  # NEW: Database initialization function
@@ -26,13 +32,56 @@ print("Initializing Database...")
 init_db()
 print("Database ready!")
 
+# =============================================================================
+# SESSION POOL (chat sessions created ahead of time)
+# =============================================================================
+#
+# Creating a session means a database INSERT + COMMIT, which the user would
+# otherwise wait for when they open the page. Instead, a background thread
+# keeps a small stock of ready-made session IDs and tops it up as they're
+# handed out.
+#
+# The cost: every restart creates up to SESSION_POOL_SIZE sessions up front,
+# and the ones nobody picks up before the next restart stay in the database
+# as empty sessions (no messages). Set SESSION_POOL_SIZE = 0 in config.py to
+# create sessions only when someone opens the page.
+#
+# daemon=True means "don't keep the app alive just for this thread"
+# (like IsBackground = true on a C# Thread).
+# =============================================================================
+
+_session_pool: queue.Queue[int] = queue.Queue(maxsize=config.SESSION_POOL_SIZE)
+
+
+def _prefill_session_pool() -> None:
+    """Keep the session pool full, forever (runs on a background thread)."""
+    retry_delay = 1  # Seconds; doubles after each failure in a row, up to a minute
+    
+    while True:
+        try:
+            session = chat_repository.create_session()
+        except Exception as error:
+            # E.g. the database is locked. Don't let the thread die (the pool
+            # would never be refilled) - wait a bit and try again.
+            print(f"Could not pre-create a chat session (retrying in {retry_delay}s): {error}")
+            time.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 60)
+            continue
+        
+        retry_delay = 1
+        _session_pool.put(session.id)  # Blocks (waits) while the pool is full
+
+
+if config.SESSION_POOL_SIZE > 0:
+    Thread(target=_prefill_session_pool, daemon=True).start()
+
 # =============================================================================
 # THE CHAT FUNCTION (Called by Gradio on each user message)
 # =============================================================================
 
-def chat(message: str, history: list[tuple[str, str]], session_id: int) -> str:
+def chat(message: str, history: list[tuple[str, str]], session_id: int) -> Iterator[str]:
     """
-    Handle a chat message and return a response.
+    Handle a chat message and stream back a response.
     
     Gradio's ChatInterface calls this function automatically when
     the user sends a message. It passes:
@@ -49,8 +98,25 @@ def chat(message: str, history: list[tuple[str, str]], session_id: int) -> str:
     
     ---
     NEW: We now use get_response_and_save() to persist messages!
+    
+    ---
+    STREAMING: 'yield from' passes every partial reply from the service
+    straight to Gradio, so the answer appears word by word instead of
+    all at once at the end. Like 'foreach (var x in src) yield return x;' in C#.
+    """
+    yield from chat_service.get_response_and_save(message, history, session_id)
+
+
+def chat_batch(messages: list[str]) -> list[list[str]]:
     """
-    return chat_service.get_response_and_save(message, history, session_id)
+    Answer several single-turn messages in one model call (API only).
+    
+    With batch=True, Gradio collects requests that arrive at the same time
+    and calls this ONCE with a list of them, instead of once per request.
+    It expects one list back per output component - here just the one.
+    """
+    responses = chat_service.get_responses(messages, [[] for _ in messages])
+    return [responses]
 
 
 # =============================================================================
@@ -76,6 +142,8 @@ def create_session_state() -> int:
     Create a new chat session in the database and return its ID.
     
     This is called once when a user opens the app (Gradio State initialization).
+    The session usually comes from the pre-filled pool, so no database
+    work happens while the user waits.
     
     Returns:
         The ID of the newly created session.
@@ -84,9 +152,14 @@ def create_session_state() -> int:
     This is like creating a new user session when someone opens your web app.
     The session_id is then stored in Gradio's State (like browser session storage).
     """
-    session = chat_repository.create_session()
-    print(f"Created new chat session with ID: {session.id}")
-    return session.id
+    try:
+        session_id = _session_pool.get_nowait()  # Take a ready-made one
+    except queue.Empty:
+        # Pool is empty (e.g. lots of users arrived at once) - create one now
+        session_id = chat_repository.create_session().id
+    
+    print(f"Assigned chat session with ID: {session_id}")
+    return session_id
 
 
 # Using Blocks for more control over the UI and state management
@@ -127,13 +200,38 @@ with gr.Blocks(theme="soft", title="🤖 Python Chat App") as demo:
     
     chat_interface = gr.ChatInterface(
         fn=chat,
-        examples=[
-            "Hello! How are you today?",
-            "Tell me a joke",
-            "What's your favorite color?",
-            "Can you help me learn Python?",
-        ],
+        examples=config.EXAMPLE_PROMPTS,  # Clickable example messages
         additional_inputs=[session_state],  # Pass session ID to chat function
+        # Same look as ChatInterface's default textbox, plus a length limit
+        # (messages longer than the database column can't be saved)
+        textbox=gr.Textbox(
+            placeholder="Type a message...",
+            container=False,
+            show_label=False,
+            scale=7,
+            max_length=config.MAX_MESSAGE_CHARS,
+        ),
+    )
+    
+    # -------------------------------------------------------------------------
+    # Batched API endpoint (/chat_batch)
+    # -------------------------------------------------------------------------
+    #
+    # ChatInterface streams each reply to its own browser tab, which can't be
+    # combined with Gradio's batching. API clients that just want an answer can
+    # use this endpoint instead, and concurrent calls share one model run.
+    # The components are hidden - they only exist to define the API.
+    # -------------------------------------------------------------------------
+    
+    batch_message = gr.Textbox(visible=False)
+    batch_response = gr.Textbox(visible=False)
+    batch_message.submit(
+        fn=chat_batch,
+        inputs=batch_message,
+        outputs=batch_response,
+        batch=True,
+        max_batch_size=config.MAX_BATCH_SIZE,
+        api_name="chat_batch",
     )
 
 # =============================================================================
@@ -154,6 +252,30 @@ with gr.Blocks(theme="soft", title="🤖 Python Chat App") as demo:
 # =============================================================================
 
 
+# =============================================================================
+# REQUEST QUEUE
+# =============================================================================
+#
+# Gradio puts every request in a queue and works through it with a limited
+# number of workers - like a bounded Channel<T> with N consumers in C#.
+#
+# - default_concurrency_limit: how many chats run on the model at once
+# - max_size: how many may wait; beyond that new users get a "busy" message
+#   instead of an ever-growing queue
+# - api_open=False: API calls must go through the queue too, so they can't
+#   skip the line (gradio_client and /chat_batch still work)
+#
+# Replies are streamed to the browser over Server-Sent Events (SSE), which
+# only sends the new part of each partial reply.
+# =============================================================================
+
+demo.queue(
+    default_concurrency_limit=config.QUEUE_CONCURRENCY_LIMIT,
+    max_size=config.QUEUE_MAX_SIZE,
+    api_open=False,
+)
+
+
 # =============================================================================
 # ENTRY POINT
 # =============================================================================
@@ -62,8 +62,11 @@ Functions are chosen here because:
 
 from typing import Optional
 
-from database import get_session
-from models import ChatSession, ChatMessage
+from sqlalchemy import delete
+
+import config
+from database import enqueue_message, fetch_history, flush_pending_messages, get_session
+from models import ChatSession
 
 
 def create_session() -> ChatSession:
@@ -108,35 +111,26 @@ def save_message(
     session_id: int, 
     user_message: str, 
     bot_response: str
-) -> ChatMessage:
+) -> None:
     """
     Save a message exchange to the database.
     
+    The message is queued and written by the database's background writer
+    thread (see BACKGROUND WRITER in database.py), so this returns
+    immediately. Call flush_pending_messages() to wait until it has been
+    written.
+    
     Args:
         session_id: The ID of the chat session
         user_message: What the user said
         bot_response: What the bot replied
     
-    Returns:
-        The saved ChatMessage object with ID populated.
-    
     ---
     C# EQUIVALENT:
     
-        public ChatMessage SaveMessage(int sessionId, string userMsg, string botResponse)
+        public void SaveMessage(int sessionId, string userMsg, string botResponse)
         {
-            using (var context = new AppDbContext())
-            {
-                var message = new ChatMessage
-                {
-                    SessionId = sessionId,
-                    UserMessage = userMsg,
-                    BotResponse = botResponse
-                };
-                context.ChatMessages.Add(message);
-                context.SaveChanges();
-                return message;
-            }
+            _writeQueue.Add(new ChatMessage { ... });  // BlockingCollection<T>
         }
     
     ---
@@ -148,23 +142,16 @@ def save_message(
             session_id: int, 
             user_message: str, 
             bot_response: str
-        ) -> ChatMessage:
+        ) -> None:
     
     This is purely for readability - Python allows this because the
     opening parenthesis hasn't been closed yet.
     """
-    with get_session() as db:
-        message = ChatMessage(
-            session_id=session_id,
-            user_message=user_message,
-            bot_response=bot_response
-        )
-        
-        db.add(message)
-        db.commit()
-        db.refresh(message)
-        
-        return message
+    # The textbox already limits what users type, but API callers skip it.
+    # [:n] keeps the first n characters (like .Substring(0, n) - but no error
+    # if the string is shorter). Too long for the column would fail the INSERT.
+    limit = config.MAX_MESSAGE_CHARS
+    enqueue_message(session_id, user_message[:limit], bot_response[:limit])
 
 
 def get_session_history(session_id: int) -> list[tuple[str, str]]:
@@ -179,6 +166,10 @@ def get_session_history(session_id: int) -> list[tuple[str, str]]:
     Returns:
         List of (user_message, bot_response) tuples, ordered by timestamp.
     
+    Don't call this inside a get_session() block: it first waits for queued
+    messages to be written, and on SQLite that raises RuntimeError there
+    (see flush_pending_messages in database.py).
+    
     ---
     C# EQUIVALENT:
     
@@ -209,19 +200,18 @@ def get_session_history(session_id: int) -> list[tuple[str, str]]:
        SQLAlchemy's query API is similar to LINQ:
        
        C#:     context.Messages.Where(m => m.SessionId == id)
-       Python: db.query(ChatMessage).filter(ChatMessage.session_id == id)
+       Python: select(ChatMessage).where(ChatMessage.session_id == id)
     """
+    # Make sure messages still waiting in the queue are included
+    flush_pending_messages()
+    
     with get_session() as db:
-        messages = (
-            db.query(ChatMessage)
-            .filter(ChatMessage.session_id == session_id)
-            .order_by(ChatMessage.timestamp)
-            .all()  # Execute query and get all results (like .ToList())
-        )
+        # Plain rows instead of ChatMessage objects (see fetch_history)
+        rows = fetch_history(db, session_id, limit=None)
         
-        # Convert to list of tuples using list comprehension
+        # Convert rows to plain tuples using list comprehension
         # This is the format Gradio needs for chat history
-        return [(msg.user_message, msg.bot_response) for msg in messages]
+        return [(row.user_message, row.bot_response) for row in rows]
 
 
 def get_or_create_session(session_id: Optional[int] = None) -> ChatSession:
@@ -255,8 +245,10 @@ def get_or_create_session(session_id: Optional[int] = None) -> ChatSession:
        
        So 'if session_id:' means "if session_id is not None and not 0"
     """
-    if session_id:
-        with get_session() as db:
+    # One database session for the lookup AND the create below
+    # (create_session's own get_session() joins this one)
+    with get_session() as db:
+        if session_id:
             # Try to find existing session
             existing = db.query(ChatSession).filter(
                 ChatSession.id == session_id
@@ -264,9 +256,9 @@ def get_or_create_session(session_id: Optional[int] = None) -> ChatSession:
             
             if existing:
                 return existing
-    
-    # No valid session_id or session not found - create new
-    return create_session()
+        
+        # No valid session_id or session not found - create new
+        return create_session()
 
 
 def get_all_sessions() -> list[ChatSession]:
@@ -292,11 +284,36 @@ def get_all_sessions() -> list[ChatSession]:
     with get_session() as db:
         return (
             db.query(ChatSession)
-            .order_by(ChatSession.created_at.desc())  # .desc() for descending
+            .order_by(ChatSession.created_at.desc(), ChatSession.id.desc())  # .desc() for descending
             .all()
         )
 
 
+def delete_session(session_id: int) -> None:
+    """
+    Delete a chat session and all of its messages.
+    
+    Sends ONE "DELETE FROM chat_sessions WHERE id = ..." and lets the database
+    delete the messages (ON DELETE CASCADE) - instead of loading every message
+    just to delete them one by one, which is what db.delete(session) does.
+    
+    NOTE: needs a chat_messages table created with ON DELETE CASCADE (see
+    models.py). On an older database the foreign key stops the delete with
+    an IntegrityError while the session has messages.
+    
+    ---
+    C# EQUIVALENT (EF Core 7+):
+    
+        context.ChatSessions.Where(s => s.Id == sessionId).ExecuteDelete();
+    """
+    # Write queued messages first, so none arrives for a deleted session
+    flush_pending_messages()
+    
+    with get_session() as db:
+        db.execute(delete(ChatSession).where(ChatSession.id == session_id))
+        db.commit()
+
+
 # =============================================================================
 # PYTHON vs C# QUERY COMPARISON CHEAT SHEET
 # =============================================================================
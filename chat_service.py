@@ -5,7 +5,20 @@ This is the 'business logic' layer. In Python, we often use FUNCTIONS
 instead of classes when there's no complex state to manage.
 """
 
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import hashlib
+from collections import OrderedDict
+from collections.abc import Iterator
+from threading import Event, Lock, Thread
+from typing import Optional
+
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    BitsAndBytesConfig,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+)
 import torch
 
 import config  # Import our config module (like 'using MyApp.Config;' in C#)
@@ -27,29 +40,419 @@ print("(This may take a minute on first run - the model will be downloaded)")
 
 # Tokenizer: Converts text to numbers (tokens) that the model understands
 # Like a translator between human text and AI-readable format
-tokenizer = AutoTokenizer.from_pretrained(config.MODEL_NAME)
+# use_fast=True picks the Rust-based tokenizer (much faster than pure Python)
+tokenizer = AutoTokenizer.from_pretrained(config.MODEL_NAME, use_fast=True)
+
+if not tokenizer.is_fast:
+    raise RuntimeError(f"No fast tokenizer available for {config.MODEL_NAME}")
+
+# The "end of text" token separates turns in DialoGPT's prompt format.
+# Looking these up on the tokenizer is a property call each time, so we
+# read them once here (like caching a value in a static readonly field).
+EOS: str = tokenizer.eos_token
+EOS_ID: int = tokenizer.eos_token_id
+
+# Device: use the GPU if there is one (much faster), otherwise the CPU
+# On a GPU we also load the weights in float16 ("half precision"): half the
+# memory to read for every token, roughly twice the speed. CPUs are slow at
+# float16 maths, so they keep the default float32.
+device = "cuda" if torch.cuda.is_available() else "cpu"
+dtype = torch.float16 if device == "cuda" else torch.float32
+
+if device == "cuda":
+    # Allow TensorFloat-32 for any float32 maths left over (faster on modern GPUs)
+    torch.set_float32_matmul_precision("high")
 
 # Model: The actual AI brain that generates responses
-model = AutoModelForCausalLM.from_pretrained(config.MODEL_NAME)
+# .eval() switches off training-only behaviour (like dropout)
+if config.LOAD_IN_8BIT and device == "cuda":
+    # 8-bit weights via bitsandbytes; device_map="auto" places them on the GPU
+    # for us (a quantized model can't be moved with .to() afterwards)
+    model = AutoModelForCausalLM.from_pretrained(
+        config.MODEL_NAME,
+        quantization_config=BitsAndBytesConfig(load_in_8bit=True),
+        device_map="auto",
+    ).eval()
+else:
+    model = AutoModelForCausalLM.from_pretrained(config.MODEL_NAME, torch_dtype=dtype).to(device).eval()
+
+# We never train, so tell PyTorch the weights don't need gradients at all.
+# Unlike torch.set_grad_enabled(False) / inference_mode() (which only affect
+# the current thread), this setting is on the weights themselves, so it
+# holds for every thread Gradio runs us on.
+model.requires_grad_(False)
+
+print(f"Model loaded successfully! (device={device}, dtype={dtype})")
+
+# Batched generation (several prompts at once) needs every prompt padded to
+# the same length. GPT-style models continue text on the RIGHT, so we pad on
+# the LEFT - that way every prompt ends right where its answer begins.
+# DialoGPT has no dedicated padding token, so we reuse the end-of-text token.
+tokenizer.padding_side = "left"
+tokenizer.pad_token = EOS
+
+# Sampling settings shared by every model.generate() call
+# ** unpacks a dict into named arguments: generate(**GENERATION_KWARGS)
+GENERATION_KWARGS: dict = dict(
+    max_new_tokens=config.MAX_NEW_TOKENS,  # Response length, not prompt + response
+    pad_token_id=EOS_ID,  # Prevents a warning
+    eos_token_id=EOS_ID,  # Stop as soon as the model says "end of text"
+    no_repeat_ngram_size=3,   # Never repeat the same 3 tokens (stops rambling loops)
+    do_sample=True,           # Add randomness (not always same response)
+    top_p=0.92,               # Nucleus sampling (quality control)
+    top_k=50,                 # Limit vocabulary choices
+    temperature=0.7,          # Lower = more focused, higher = more creative
+)
+
+# =============================================================================
+# WARMUP
+# =============================================================================
+#
+# The very first generate() call is slow: PyTorch picks kernels, CUDA tunes
+# itself, torch.compile (if on) compiles... We'd rather pay that now, at
+# startup, than on the first user's message. A few short runs on the
+# example prompts do the trick. {**a, "x": 1} copies a dict with one change.
+#
+# torch.compile: generate() calls model.forward() once per new token, so
+# that's the part worth compiling. "reduce-overhead" also uses CUDA graphs
+# on the GPU. torch.compile() itself only wraps the function - the real
+# compiling happens on the first calls, i.e. during warmup. So that's
+# where a failure shows up, and where we fall back to the normal forward().
+# =============================================================================
+
+def _warm_up() -> None:
+    with torch.inference_mode():
+        for prompt in config.EXAMPLE_PROMPTS:
+            warmup_ids = tokenizer.encode(f"{prompt}{EOS}", return_tensors="pt").to(device)
+            model.generate(warmup_ids, **{**GENERATION_KWARGS, "max_new_tokens": 16})
+
+
+print("Warming up the model...")
+_uncompiled_forward = model.forward
+
+try:
+    if config.COMPILE_MODEL:
+        model.forward = torch.compile(
+            model.forward,
+            mode="reduce-overhead" if device == "cuda" else "default",
+            fullgraph=False,
+        )
+    _warm_up()
+except Exception as error:
+    if not config.COMPILE_MODEL:
+        raise  # Nothing to fall back to - a real problem with the model
+    print(f"torch.compile failed, running uncompiled: {error}")
+    model.forward = _uncompiled_forward
+    _warm_up()
+
+print("Model ready!")
+
+
+# =============================================================================
+# PREFIX CACHE (already-tokenized conversation turns, per chat session)
+# =============================================================================
+#
+# Every turn the prompt is "all previous turns + the new message". Tokenizing
+# the old turns again is wasted work - their token IDs never change. So we
+# remember them per session_id and only tokenize the newest message.
+#
+# Each entry is (number_of_turns_seen, [token_ids_per_turn]). The turn count
+# lets us check the cache still matches the history Gradio sends (e.g. after
+# the user clicks "Undo" or "Retry", it won't - and we simply re-tokenize).
+#
+# OrderedDict remembers insertion order, which makes it an easy LRU cache:
+# - move_to_end(key) marks an entry as "recently used"
+# - popitem(last=False) removes the least recently used entry
+# In C# you'd build this from a Dictionary + LinkedList.
+# =============================================================================
+
+_PREFIX_CACHE: OrderedDict[int, tuple[int, list[torch.Tensor]]] = OrderedDict()
+_PREFIX_CACHE_LOCK = Lock()  # Gradio serves several users on different threads
+
+
+def _encode_turn(user_msg: str, bot_msg: str) -> torch.Tensor:
+    """Tokenize one (user, bot) exchange exactly as it appears in the prompt."""
+    return tokenizer.encode(
+        f"{user_msg}{EOS}{bot_msg}{EOS}",
+        return_tensors="pt"
+    )
+
+
+def _get_history_ids(
+    history: list[tuple[str, str]], 
+    session_id: Optional[int]
+) -> list[torch.Tensor]:
+    """
+    Return the token IDs of the last MAX_HISTORY_TURNS turns, one tensor per turn.
+    
+    Uses the prefix cache when it matches the history; tokenizes otherwise.
+    """
+    if session_id is not None:
+        with _PREFIX_CACHE_LOCK:
+            cached = _PREFIX_CACHE.get(session_id)
+            if cached is not None and cached[0] == len(history):
+                _PREFIX_CACHE.move_to_end(session_id)
+                return cached[1]
+    
+    # Only keep the last few turns - history[-N:] is "the last N items"
+    # (like history.TakeLast(N) in C#)
+    recent_turns = history[-config.MAX_HISTORY_TURNS:]
+    
+    if not recent_turns:
+        return []
+    
+    # Tokenize all turns in ONE tokenizer call (the fast tokenizer handles a
+    # list in native code) rather than one call per turn.
+    # Tuple unpacking (like C# deconstruction)
+    texts = [f"{user_msg}{EOS}{bot_msg}{EOS}" for user_msg, bot_msg in recent_turns]
+    
+    return [torch.tensor([ids]) for ids in tokenizer(texts)["input_ids"]]
+
+
+def _remember_turn(
+    session_id: int, 
+    turn_count: int, 
+    history_ids: list[torch.Tensor], 
+    message: str, 
+    response: str
+) -> None:
+    """Add a finished exchange to the session's prefix cache."""
+    turns = (history_ids + [_encode_turn(message, response)])[-config.MAX_HISTORY_TURNS:]
+    
+    with _PREFIX_CACHE_LOCK:
+        _PREFIX_CACHE[session_id] = (turn_count + 1, turns)
+        _PREFIX_CACHE.move_to_end(session_id)
+        
+        if len(_PREFIX_CACHE) > config.PREFIX_CACHE_SIZE:
+            _PREFIX_CACHE.popitem(last=False)  # Evict the least recently used session
+
+
+# =============================================================================
+# KV CACHE (the model's attention state, reused between turns)
+# =============================================================================
+#
+# While generating, the model computes "keys" and "values" for every token in
+# the prompt. generate() can hand those back (past_key_values) and accept them
+# on the next call, so next turn the model only processes the NEW tokens.
+#
+# Each entry is (token_ids, past_key_values, size_in_bytes). token_ids are the
+# tokens the cache covers - we only reuse the part that matches the start of
+# the new prompt (after a retry or once old turns drop out, it won't match).
+# =============================================================================
+
+# Legacy format: one (keys, values) pair of tensors per transformer layer
+KeyValues = tuple[tuple[torch.Tensor, torch.Tensor], ...]
+
+_KV_CACHE: OrderedDict[int, tuple[torch.Tensor, KeyValues, int]] = OrderedDict()
+_KV_CACHE_LOCK = Lock()
+
+
+def _kv_nbytes(past_key_values: KeyValues) -> int:
+    """How much memory a KV cache uses (like summing array lengths * sizeof)."""
+    return sum(t.numel() * t.element_size() for layer in past_key_values for t in layer)
+
+
+def _take_kv_cache(session_id: int, input_ids: torch.Tensor) -> Optional[KeyValues]:
+    """
+    Remove and return the session's KV cache, trimmed to the part of it
+    that matches the start of input_ids. Returns None if nothing matches.
+    """
+    with _KV_CACHE_LOCK:
+        cached = _KV_CACHE.pop(session_id, None)  # pop = get + remove
+    
+    if cached is None:
+        return None
+    
+    cached_ids, past_key_values, _ = cached
+    
+    # Count how many leading tokens are identical (like a common-prefix loop in C#)
+    length = min(cached_ids.shape[1], input_ids.shape[1] - 1)  # Leave >= 1 token to process
+    matches = (cached_ids[0, :length] == input_ids[0, :length]).tolist()
+    common = matches.index(False) if False in matches else length
+    
+    if common == 0:
+        return None
+    
+    # Drop the cached keys/values for tokens that don't match
+    # Tensor shape is (batch, heads, tokens, head_size) - we slice the tokens
+    return tuple((keys[:, :, :common], values[:, :, :common]) for keys, values in past_key_values)
+
+
+def _store_kv_cache(session_id: int, sequences: torch.Tensor, past_key_values: KeyValues) -> None:
+    """Save a session's KV cache, evicting old sessions to stay in budget."""
+    past_key_values = tuple(tuple(layer) for layer in past_key_values)
+    
+    # The very last generated token is never fed back through the model,
+    # so the cache covers one token less than the full sequence
+    covered = past_key_values[0][0].shape[2]
+    nbytes = _kv_nbytes(past_key_values)
+    
+    with _KV_CACHE_LOCK:
+        _KV_CACHE[session_id] = (sequences[:, :covered], past_key_values, nbytes)
+        
+        budget = config.KV_CACHE_MAX_MB * 1024 * 1024
+        while len(_KV_CACHE) > 1 and sum(entry[2] for entry in _KV_CACHE.values()) > budget:
+            _KV_CACHE.popitem(last=False)  # Evict the least recently used session
+
+
+# =============================================================================
+# RESPONSE CACHE (answers to prompts we've seen before)
+# =============================================================================
+#
+# The example buttons ("Tell me a joke", ...) send the exact same prompt over
+# and over. Instead of running the model again, we remember the answer.
+#
+# Only FIRST messages (no history) are cached - that's where the example
+# buttons land; later turns hardly ever repeat exactly. The key is a hash of
+# the prompt's token IDs. The trade-off: different users sending the same
+# first message get the same reply, even though generation itself is random.
+#
+# Retry: Gradio's Retry button resends the same message, which would just
+# give back the same cached reply. So we remember which prompt each chat
+# session was last answered for, and if it asks again we generate a new one.
+#
+# Empty replies (DialoGPT sometimes ends right away) are never cached.
+# =============================================================================
+
+_RESPONSE_CACHE: OrderedDict[bytes, str] = OrderedDict()
+_LAST_ANSWERED: OrderedDict[int, bytes] = OrderedDict()  # session_id -> prompt key
+_RESPONSE_CACHE_LOCK = Lock()
+
 
-print("Model loaded successfully!")
+def _prompt_key(input_ids: torch.Tensor) -> bytes:
+    """A short fingerprint of a prompt (like computing a hash code in C#)."""
+    return hashlib.blake2b(input_ids.numpy().tobytes(), digest_size=16).digest()
+
+
+def _remember_answered(session_id: Optional[int], key: bytes) -> None:
+    """Note that this session got an answer for this prompt (call with the lock held)."""
+    if session_id is None:
+        return
+    
+    _LAST_ANSWERED[session_id] = key
+    _LAST_ANSWERED.move_to_end(session_id)
+    
+    if len(_LAST_ANSWERED) > config.RESPONSE_CACHE_SIZE:
+        _LAST_ANSWERED.popitem(last=False)
+
+
+def _get_cached_response(key: bytes, session_id: Optional[int]) -> Optional[str]:
+    with _RESPONSE_CACHE_LOCK:
+        if session_id is not None and _LAST_ANSWERED.get(session_id) == key:
+            return None  # Same session, same prompt again: that's Retry
+        
+        response = _RESPONSE_CACHE.get(key)
+        if response is not None:
+            _RESPONSE_CACHE.move_to_end(key)
+            _remember_answered(session_id, key)
+        return response
+
+
+def _cache_response(key: bytes, response: str, session_id: Optional[int]) -> None:
+    with _RESPONSE_CACHE_LOCK:
+        _remember_answered(session_id, key)
+        
+        if not response.strip():
+            return  # Don't serve an empty reply to everyone who asks next
+        
+        _RESPONSE_CACHE[key] = response
+        _RESPONSE_CACHE.move_to_end(key)
+        
+        if len(_RESPONSE_CACHE) > config.RESPONSE_CACHE_SIZE:
+            _RESPONSE_CACHE.popitem(last=False)
+
+
+def _generate_in_background(result: dict, **gen_kwargs) -> None:
+    """
+    Run model.generate() and put its output in result["output"].
+    
+    A Thread can't return a value (like a Task<T> can in C#), so we pass in
+    a dict for it to fill. If generation fails we stop the streamer, so the
+    reading side doesn't wait forever, and hand over the error instead.
+    """
+    try:
+        # inference_mode() turns off gradient tracking (only needed for training)
+        # It is per-thread, so it has to be set here, not in the caller
+        with torch.inference_mode():
+            result["output"] = model.generate(**gen_kwargs)
+    except Exception as error:
+        result["error"] = error
+        gen_kwargs["streamer"].end()
+
+
+class _StopWhenSet(StoppingCriteria):
+    """
+    Tells generate() to stop once an Event is set - like passing a
+    CancellationToken in C#. generate() checks it after every new token.
+    """
+    
+    def __init__(self, stop: Event):
+        self.stop = stop
+    
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        # One True/False per prompt in the batch
+        return torch.full((input_ids.shape[0],), self.stop.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+def _build_input_ids(
+    message: str, 
+    history: list[tuple[str, str]], 
+    session_id: Optional[int]
+) -> tuple[list[torch.Tensor], torch.Tensor]:
+    """
+    Build the model prompt for a new message.
+    
+    Returns:
+        (history_ids, input_ids): the tokenized previous turns (one tensor
+        per turn, for the prefix cache) and the full prompt as one tensor.
+    """
+    # Only the new user message needs tokenizing
+    new_ids = tokenizer.encode(f"{message}{EOS}", return_tensors="pt")
+    # return_tensors="pt" means return a PyTorch tensor (the format the model needs)
+    
+    # Fast path: the first message of a chat has no history to look up or join
+    if not history:
+        history_ids = []
+        input_ids = new_ids
+    else:
+        # Build conversation context from history
+        # We need the previous messages so the model remembers the conversation
+        # (already tokenized, one tensor per turn - see the prefix cache above)
+        history_ids = _get_history_ids(history, session_id)
+        
+        # Glue all the pieces together along dimension 1 (the token dimension)
+        input_ids = torch.cat(history_ids + [new_ids], dim=1)
+    
+    # Keep only the most recent tokens if the prompt is still too long
+    if input_ids.shape[1] > config.MAX_CONTEXT_TOKENS:
+        input_ids = input_ids[:, -config.MAX_CONTEXT_TOKENS:]
+    
+    return history_ids, input_ids
 
 
 # =============================================================================
 # MAIN FUNCTION
 # =============================================================================
 
-def get_response(message: str, history: list[tuple[str, str]]) -> str:
+def get_response(
+    message: str, 
+    history: list[tuple[str, str]], 
+    session_id: Optional[int] = None
+) -> Iterator[str]:
     """
-    Generate a response to the user's message.
+    Generate a response to the user's message, streaming it as it is produced.
     
     Args:
         message: The user's input text
         history: List of previous (user_message, bot_response) tuples
                  This is how Gradio passes chat history
+        session_id: Optional chat session ID. When given, the tokenized
+                    history is cached so the next turn only tokenizes
+                    the new message.
     
-    Returns:
-        The AI's response as a string
+    Yields:
+        The AI's response so far (each value is the full partial reply,
+        growing by a few characters at a time)
     
     ---
     PYTHON CONCEPTS:
@@ -57,7 +460,7 @@ def get_response(message: str, history: list[tuple[str, str]]) -> str:
     1. FUNCTION DEFINITION
        def function_name(param: Type) -> ReturnType:
        
-       Like C#: public string GetResponse(string message, List<...> history)
+       Like C#: public IEnumerable<string> GetResponse(string message, List<...> history)
     
     2. DOCSTRINGS IN FUNCTIONS
        The triple-quoted string right after 'def' documents the function.
@@ -67,54 +470,95 @@ def get_response(message: str, history: list[tuple[str, str]]) -> str:
        list[tuple[str, str]] means: List<(string, string)> in C#
        - list[X] = List<X>
        - tuple[A, B] = (A, B) value tuple
+    
+    4. GENERATORS (yield)
+       A function containing 'yield' is a generator - exactly like a C#
+       iterator method with 'yield return'. Gradio's ChatInterface accepts
+       generators and updates the chat bubble every time we yield.
     """
     
-    # Build conversation context from history
-    # We need to format previous messages so the model remembers the conversation
-    conversation_history = ""
+    # =============================================================================
+    # ENCODING: Convert text to token IDs (numbers)
+    # =============================================================================
+    history_ids, input_ids = _build_input_ids(message, history, session_id)
+    
+    # A first message we've answered before? Answer from the cache, skip the model
+    # (only first messages are cached - see RESPONSE CACHE above)
+    prompt_key = _prompt_key(input_ids) if not history else None
+    cached_response = _get_cached_response(prompt_key, session_id) if prompt_key is not None else None
+    
+    if cached_response is not None:
+        yield cached_response
+        if session_id is not None:
+            _remember_turn(session_id, len(history), history_ids, message, cached_response)
+        return  # In a generator, 'return' just ends the stream
     
-    for user_msg, bot_msg in history:  # Tuple unpacking (like C# deconstruction)
-        conversation_history += f"{user_msg}{tokenizer.eos_token}{bot_msg}{tokenizer.eos_token}"
+    # Move the tokens to wherever the model lives (GPU or CPU)
+    input_ids = input_ids.to(device)
     
-    # Add the new user message
-    conversation_history += f"{message}{tokenizer.eos_token}"
+    # Reuse the model's attention state from last turn (if it still matches)
+    past_key_values = _take_kv_cache(session_id, input_ids) if session_id is not None else None
     
     # =============================================================================
-    # ENCODING: Convert text to token IDs (numbers)
+    # STREAMING: Decode tokens as soon as the model produces them
     # =============================================================================
-    input_ids = tokenizer.encode(conversation_history, return_tensors="pt")
-    # return_tensors="pt" means return a PyTorch tensor (the format the model needs)
+    # The streamer is a thread-safe queue of text chunks. skip_prompt=True means
+    # we only get the NEW tokens (the response), not the input echoed back.
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
     
     # =============================================================================
-    # GENERATION: Let the model predict the next tokens
+    # GENERATION: Let the model predict the next tokens (in a background thread)
     # =============================================================================
-    output_ids = model.generate(
-        input_ids,
-        max_length=config.MAX_LENGTH,
-        pad_token_id=tokenizer.eos_token_id,  # Prevents a warning
-        do_sample=True,           # Add randomness (not always same response)
-        top_p=0.92,               # Nucleus sampling (quality control)
-        top_k=50,                 # Limit vocabulary choices
-        temperature=0.7,          # Lower = more focused, higher = more creative
+    # model.generate() blocks until the whole reply is done, so we run it on
+    # another thread and read from the streamer here.
+    # Like: Task.Run(() => model.Generate(...)) while we consume a Channel<string>
+    stop = Event()
+    gen_kwargs = dict(
+        input_ids=input_ids,
+        past_key_values=past_key_values,  # Skip tokens the model has already seen
+        use_cache=True,
+        return_dict_in_generate=True,     # Also give us back the new past_key_values
+        streamer=streamer,
+        stopping_criteria=StoppingCriteriaList([_StopWhenSet(stop)]),
+        **GENERATION_KWARGS,
     )
+    result: dict = {}
+    generation = Thread(target=_generate_in_background, args=(result,), kwargs=gen_kwargs)
+    generation.start()
     
     # =============================================================================
-    # DECODING: Convert token IDs back to text
+    # DECODING: Yield the growing response as text arrives
     # =============================================================================
-    # We only want the NEW tokens (the response), not the input echoed back
-    # input_ids.shape[1] gives us the length of the input
-    new_tokens = output_ids[:, input_ids.shape[1]:]
+    # If the user presses Stop or closes the page, Gradio closes this generator
+    # and we never get past the 'yield'. 'finally' still runs then, and tells
+    # the background thread to stop instead of generating a reply nobody reads.
+    response = ""
+    try:
+        for new_text in streamer:  # Blocks until the next chunk is ready
+            response += new_text
+            yield response
+    finally:
+        stop.set()
+    
+    generation.join()  # Wait for the thread to finish (like await task)
+    if "error" in result:
+        raise result["error"]
     
-    response = tokenizer.decode(new_tokens[0], skip_special_tokens=True)
+    if prompt_key is not None:
+        _cache_response(prompt_key, response, session_id)
     
-    return response
+    # Remember this exchange so the next turn doesn't re-tokenize or re-compute it
+    if session_id is not None:
+        _remember_turn(session_id, len(history), history_ids, message, response)
+        output = result["output"]
+        _store_kv_cache(session_id, output.sequences, output.past_key_values)
 
 
 def get_response_and_save(
     message: str, 
     history: list[tuple[str, str]], 
     session_id: int
-) -> str:
+) -> Iterator[str]:
     """
     Generate a response AND save it to the database.
     
@@ -125,8 +569,8 @@ def get_response_and_save(
         history: List of previous (user_message, bot_response) tuples
         session_id: The ID of the chat session to save to
     
-    Returns:
-        The AI's response as a string
+    Yields:
+        The AI's response so far (same as get_response())
     
     ---
     PYTHON CONCEPT: FUNCTION COMPOSITION
@@ -140,18 +584,74 @@ def get_response_and_save(
     
     We keep get_response() separate so it can still be used without persistence
     (useful for testing or if someone wants to use the model without a database).
+    
+    Because get_response() is a generator, we pass each partial reply straight
+    through and only save ONCE, after the stream has finished.
     """
-    # Generate the response using the existing function
-    response = get_response(message, history)
+    response = ""
     
-    # Save to database
+    # Stream the response using the existing function
+    for response in get_response(message, history, session_id):
+        yield response
+    
+    # Save the final response to database
     chat_repository.save_message(
         session_id=session_id,
         user_message=message,
         bot_response=response
     )
+
+
+# =============================================================================
+# BATCH GENERATION (several users at once)
+# =============================================================================
+#
+# On a GPU, answering 8 prompts in one generate() call takes about as long as
+# answering 1 - the hardware is mostly waiting on memory, not maths. Gradio
+# can collect concurrent requests into a list for us (batch=True in app.py).
+# =============================================================================
+
+def get_responses(
+    messages: list[str], 
+    histories: list[list[tuple[str, str]]]
+) -> list[str]:
+    """
+    Generate responses for several conversations in a single model call.
+    
+    Args:
+        messages: One new user message per conversation
+        histories: One (user_message, bot_response) history per conversation
+    
+    Returns:
+        One response per conversation, in the same order.
+    
+    ---
+    PYTHON CONCEPT: zip()
+    
+    zip(a, b) walks two lists side by side, like Enumerable.Zip in C#.
+    """
+    prompts = [
+        _build_input_ids(message, history, session_id=None)[1][0].tolist()
+        for message, history in zip(messages, histories)
+    ]
+    
+    # Pad every prompt (on the left) to the same length. attention_mask marks
+    # which tokens are real (1) and which are padding (0) so the model ignores them.
+    batch = tokenizer.pad({"input_ids": prompts}, padding=True, return_tensors="pt").to(device)
+    
+    with torch.inference_mode():
+        output_ids = model.generate(
+            batch["input_ids"],
+            attention_mask=batch["attention_mask"],
+            **GENERATION_KWARGS,
+        )
+    
+    # Every row has the same prompt length thanks to padding, so one slice works
+    new_tokens = output_ids[:, batch["input_ids"].shape[1]:]
     
-    return response
+    # Copy the token IDs off the GPU in one go (.cpu().tolist()) rather than
+    # letting the tokenizer pull them out one element at a time
+    return tokenizer.batch_decode(new_tokens.cpu().tolist(), skip_special_tokens=True)
 
 
 # =============================================================================
@@ -176,10 +676,9 @@ def get_response_and_save(
 #    - Automatically splits each tuple into two variables
 #    - Like: foreach (var (userMsg, botMsg) in history) in C#
 #
-# 5. SLICING (output_ids[:, input_ids.shape[1]:])
-#    - Python's powerful array slicing syntax
-#    - [start:end] extracts a portion
-#    - [:, X:] means "all rows, columns from X onwards"
-#    - No direct C# equivalent - LINQ would be more verbose
+# 5. GENERATORS (yield)
+#    - 'yield response' hands out one value and pauses the function
+#    - Like 'yield return' in a C# IEnumerable<T> method
+#    - 'for x in generator:' resumes it until the next yield
 #
 # =============================================================================
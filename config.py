@@ -16,7 +16,53 @@ import os  # Standard library for operating system operations
 MODEL_NAME: str = "microsoft/DialoGPT-medium"
 
 # Maximum length of generated responses (in tokens, roughly ~4 chars per token)
-MAX_LENGTH: int = 1000
+# This counts only the NEW tokens, so it doesn't shrink as the chat grows
+MAX_NEW_TOKENS: int = 128
+
+# How many previous (user, bot) exchanges the model gets to see
+# Older turns are dropped - the model re-reads the whole prompt every turn,
+# so a longer prompt means slower responses
+MAX_HISTORY_TURNS: int = 6
+
+# Hard cap on the prompt size (in tokens), in case a few turns are very long
+# DialoGPT can only handle 1024 tokens total (prompt + response)
+MAX_CONTEXT_TOKENS: int = 512
+
+# How many chat sessions keep their already-tokenized history in memory
+# (so we only tokenize the newest message each turn, not the whole chat)
+PREFIX_CACHE_SIZE: int = 128
+
+# Memory budget (in MB) for the model's attention cache kept between turns
+# Reusing it means the model only processes the new tokens each turn, but it
+# is big: roughly 100 MB per session for a full-length DialoGPT-medium chat
+KV_CACHE_MAX_MB: int = 1024
+
+# How many answers to remember for first messages seen before (e.g. the
+# example buttons). A repeated one is answered instantly, without the model.
+RESPONSE_CACHE_SIZE: int = 1024
+
+# Example messages shown as clickable buttons under the chat box
+# (the model is also warmed up with these when the app starts)
+EXAMPLE_PROMPTS: list[str] = [
+    "Hello! How are you today?",
+    "Tell me a joke",
+    "What's your favorite color?",
+    "Can you help me learn Python?",
+]
+
+# Largest number of requests the batch API endpoint answers in one model call
+MAX_BATCH_SIZE: int = 8
+
+# Load the model weights as 8-bit integers instead of 16/32-bit floats
+# (about 4x less memory than float32, so each token needs less data read).
+# Needs a CUDA GPU and the 'bitsandbytes' package. Turn on with:
+#   $env:CHATAPP_LOAD_IN_8BIT = "1"
+LOAD_IN_8BIT: bool = os.getenv("CHATAPP_LOAD_IN_8BIT") == "1"
+
+# Compile the model with torch.compile (fuses operations into faster kernels).
+# The first few responses are slow while it compiles, so it's opt-in:
+#   $env:CHATAPP_COMPILE_MODEL = "1"
+COMPILE_MODEL: bool = os.getenv("CHATAPP_COMPILE_MODEL") == "1"
 
 # =============================================================================
 # PYTHON CONCEPTS DEMONSTRATED HERE:
@@ -63,6 +109,37 @@ HF_TOKEN: str | None = os.getenv("HF_TOKEN")
 # The three slashes (///) mean: "local file, relative path"
 DATABASE_URL: str = "sqlite:///chat_history.db"
 
+# Connection pool: how many database connections stay open for reuse,
+# and how many extra ones may be opened when it's busy
+DB_POOL_SIZE: int = 20
+DB_MAX_OVERFLOW: int = 10
+
+# Replace pooled connections older than this (in seconds), so a long-running
+# server never holds on to a connection the database side has dropped
+DB_POOL_RECYCLE_SECONDS: int = 3600
+
+# How many compiled SQL statements SQLAlchemy keeps cached (oldest dropped first)
+DB_QUERY_CACHE_SIZE: int = 1200
+
+# Print memory allocation changes around every database session (slow!)
+# Only for hunting memory leaks, e.g. in CI. Turn on with:
+#   $env:CHATAPP_PROFILE = "1"
+PROFILE_MEMORY: bool = os.getenv("CHATAPP_PROFILE") == "1"
+
+# How many chat sessions to create ahead of time, so opening the app doesn't
+# have to wait for a database INSERT. Those not handed out before a restart
+# are left behind as empty sessions; 0 turns the pool off.
+SESSION_POOL_SIZE: int = 16
+
+# Chat messages are saved by a background thread, with one commit for
+# everything that is waiting - but at most this many messages per commit
+WRITE_BATCH_MAX: int = 64
+
+# Longest chat message (in characters) we accept and store - the size of the
+# message columns in the database (see models.py). The chat textbox stops
+# typing at this length, and save_message() cuts off anything longer.
+MAX_MESSAGE_CHARS: int = 8192
+
 # =============================================================================
 # FUTURE: If you want to switch databases, just change DATABASE_URL!
 # =============================================================================
@@ -74,3 +151,14 @@ DATABASE_URL: str = "sqlite:///chat_history.db"
 # SQLAlchemy abstracts the differences - your Python code stays the same!
 # This is just like how EF Core lets you switch between SQL Server/SQLite/etc.
 # =============================================================================
+
+
+# =============================================================================
+# WEB SERVER CONFIGURATION
+# =============================================================================
+
+# How many chat requests Gradio runs at the same time
+QUEUE_CONCURRENCY_LIMIT: int = 4
+
+# How many requests may wait in line before new ones are turned away
+QUEUE_MAX_SIZE: int = 64
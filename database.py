@@ -34,12 +34,19 @@ In SQLAlchemy:
 The Session is your 'unit of work' - it tracks changes and commits them.
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from contextlib import contextmanager
+from sqlalchemy import create_engine, event, insert, select, text
+from sqlalchemy.orm import configure_mappers, scoped_session, sessionmaker
+import atexit
+import queue  # Thread-safe queue (like BlockingCollection<T> in C#)
+import tracemalloc  # Standard library memory profiler
+from contextlib import contextmanager, nullcontext
+from threading import Event, RLock, Thread
 
 import config  # Our config module with DATABASE_URL
-from models import Base  # The base class that knows about all our models
+from models import Base, ChatMessage  # Base knows about all our models
+
+# SQLite needs some special handling (see PRAGMAs and the lock below)
+IS_SQLITE: bool = config.DATABASE_URL.startswith("sqlite")
 
 
 # =============================================================================
@@ -56,14 +63,89 @@ from models import Base  # The base class that knows about all our models
 # - 'check_same_thread=False' allows SQLite to be used across threads
 #   (SQLite normally restricts this for safety, but we need it for web apps)
 # - 'echo=True' prints all SQL statements (great for learning! Turn off in prod)
+#
+# CONNECTION POOL:
+# - The engine keeps up to 'pool_size' connections open and hands them out,
+#   so sessions don't pay to open the database file every time
+# - 'max_overflow' extra connections may be opened under load (closed after)
+# - 'pool_recycle' replaces connections after they've been open this long
+# - 'pool_pre_ping' checks a connection still works before handing it out
+# Like "Max Pool Size" / "Connection Lifetime" in an ADO.NET connection string.
+#
+# COMPILED SQL CACHE:
+# - SQLAlchemy turns each query into SQL text once and caches the result;
+#   'query_cache_size' caps how many of these it keeps (least-recently-used
+#   ones are dropped), so memory stays bounded in a long-running server
+#
+# NOTE: SQLAlchemy also offers StaticPool (ONE connection shared by every
+# thread). We don't use it: Gradio runs requests on several threads, and they
+# would end up mixing their transactions on that one connection.
 # =============================================================================
 
 engine = create_engine(
     config.DATABASE_URL,
     connect_args={"check_same_thread": False},  # Needed for SQLite in web apps
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_recycle=config.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=True,
+    query_cache_size=config.DB_QUERY_CACHE_SIZE,
     echo=False  # Set to True to see all SQL queries (helpful for debugging!)
 )
 
+# =============================================================================
+# SQLITE TUNING (PRAGMAs)
+# =============================================================================
+#
+# PRAGMAs are SQLite's settings. They apply per connection, so we run them
+# every time SQLAlchemy opens a new one - the "connect" event is like an
+# event handler in C#:  engine.Connected += (conn, record) => { ... };
+#
+# - journal_mode=WAL: write-ahead log. Readers don't block the writer, and a
+#   commit appends to a log instead of rewriting pages (much faster commits).
+# - synchronous=NORMAL: with WAL this is still safe against app crashes and
+#   saves a disk flush (fsync) on every commit.
+# - temp_store=MEMORY: temporary tables/indexes (e.g. for sorting) stay in RAM.
+# - mmap_size: read the database file through memory-mapping (256 MB window),
+#   skipping a copy into SQLite's own buffers on every read.
+# - cache_size: negative means KiB, so -65536 = a 64 MB page cache per connection.
+# - foreign_keys=ON: SQLite ignores foreign keys (and ON DELETE CASCADE)
+#   unless this is switched on.
+# =============================================================================
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+# =============================================================================
+# SQLITE TRANSACTIONS (explicit BEGIN)
+# =============================================================================
+#
+# Python's sqlite3 driver normally starts and commits transactions on its own,
+# guessing from the SQL it sees. isolation_level = None switches that off,
+# and instead SQLAlchemy's "begin" event emits BEGIN exactly when a
+# transaction starts. Commits then happen only when WE call commit().
+# (This is the recipe from SQLAlchemy's SQLite documentation.)
+# =============================================================================
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _disable_driver_transactions(dbapi_connection, connection_record) -> None:
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine, "begin")
+    def _begin_sqlite_transaction(connection) -> None:
+        connection.exec_driver_sql("BEGIN")
+
 # =============================================================================
 # CREATE SESSION FACTORY
 # =============================================================================
@@ -74,18 +156,55 @@ engine = create_engine(
 # In C# DI terms:
 #     services.AddScoped<AppDbContext>();  // Creates new context per request
 #
-# SessionLocal is a CLASS that, when instantiated, creates a new Session:
-#     session = SessionLocal()  # Like: var context = new AppDbContext()
+# scoped_session() wraps the factory so each THREAD gets one Session object
+# that is reused from call to call (Gradio runs requests on worker threads):
+#     session = SessionLocal()  # This thread's session (created on first use)
 #
 # autocommit=False: We manually call commit() (explicit transactions)
 # autoflush=False:  We manually flush to DB (more control over when writes happen)
+# expire_on_commit=False: Keep loaded values after commit(), instead of
+#                         re-SELECTing them the next time they're read
 # =============================================================================
 
-SessionLocal = sessionmaker(
+SessionLocal = scoped_session(sessionmaker(
     autocommit=False,
     autoflush=False,
+    expire_on_commit=False,
     bind=engine  # Bind to our engine (database connection)
-)
+))
+
+
+# =============================================================================
+# SQLITE LOCK (one session at a time)
+# =============================================================================
+#
+# SQLite allows only ONE writer at a time. When two threads try anyway, one
+# fails with "database is locked" and has to retry. With check_same_thread=False
+# nothing stops that from happening, so we take turns explicitly:
+# get_session() holds this lock for as long as its 'with' block runs.
+#
+# RLock is a re-entrant lock (like C#'s 'lock' / Monitor): the thread holding
+# it may take it again, so nested get_session() calls don't deadlock.
+# Other databases handle concurrency themselves, so there we use a
+# nullcontext() - a "lock" that does nothing.
+# =============================================================================
+
+_sqlite_lock = RLock() if IS_SQLITE else nullcontext()
+
+
+# =============================================================================
+# MEMORY PROFILING (opt-in, for CI / debugging)
+# =============================================================================
+#
+# With CHATAPP_PROFILE=1, get_session() prints the 5 places that allocated
+# the most memory (still held) during each session - handy for spotting a
+# leak, e.g. objects kept alive after the session closed. tracemalloc slows
+# everything down, so it's off unless asked for.
+# 25 = how many stack frames to remember for each allocation.
+# =============================================================================
+
+if config.PROFILE_MEMORY:
+    tracemalloc.start(25)
 
 
 # =============================================================================
@@ -123,6 +242,16 @@ def get_session():
             context.SaveChanges();
         }
     
+    NESTING: a get_session() inside another one (on the same thread) gets
+    the SAME session, and only the outermost block closes it. So a function
+    that calls several repository functions can wrap them in one
+    get_session() and they all share one session and one connection -
+    like one scoped DbContext per request in ASP.NET Core.
+    
+    On SQLite the block holds _sqlite_lock the whole time, so don't wait for
+    other threads inside it: flush_pending_messages() (and therefore
+    chat_repository.get_session_history()) raises if called in here.
+    
     ---
     PYTHON CONCEPTS:
     
@@ -135,21 +264,327 @@ def get_session():
        - Here, 'yield session' means "pause here, give this to the 'with' block"
        - When the 'with' block finishes, continue after yield
     
-    3. try/finally
-       - Works exactly like C# - finally always runs
+    3. try/except/finally
+       - Works exactly like C# try/catch/finally - finally always runs
+       - Rolls back on an exception, then re-raises it
        - Ensures session.close() happens even if there's an exception
     """
-    session = SessionLocal()  # Create a new session
+    with _sqlite_lock:  # Wait for our turn (SQLite only - see above)
+        session = SessionLocal()  # This thread's session
+        
+        # session.info is a free-to-use dict on the session; we count how
+        # many get_session() blocks are currently open on it
+        depth = session.info.get("depth", 0)
+        session.info["depth"] = depth + 1
+        
+        profiling = config.PROFILE_MEMORY and depth == 0
+        before = tracemalloc.take_snapshot() if profiling else None
+        
+        try:
+            yield session  # Give it to the 'with' block
+        except Exception:
+            # Something failed inside the 'with' block: undo any half-done
+            # changes so the connection goes back to the pool clean.
+            # 'raise' on its own re-throws the same error (like 'throw;' in C#)
+            session.rollback()
+            raise
+        finally:
+            session.info["depth"] = depth
+            
+            # The outermost block always closes when done (like Dispose()).
+            # This ends the transaction, returns the connection to the pool and
+            # forgets every loaded object (so they can be garbage-collected);
+            # the Session object itself stays registered for this thread and
+            # is reused next time.
+            if depth == 0:
+                session.close()
+            
+            if profiling:
+                after = tracemalloc.take_snapshot()
+                for stat in after.compare_to(before, "lineno")[:5]:
+                    print(f"[memory] {stat}")
+
+
+# =============================================================================
+# MESSAGE INSERTS (the hottest write path)
+# =============================================================================
+#
+# The INSERT statement for chat messages is built ONCE, here at import time,
+# and reused for every write - like a static readonly SqlCommand in C#.
+# Its SQL is compiled on first use and then found in the engine's compiled
+# cache every time after; writing through it also skips the ORM's
+# unit-of-work bookkeeping (no ChatMessage objects to track and flush).
+# The timestamp is left out on purpose: the database fills it in.
+# =============================================================================
+
+INSERT_MESSAGE = insert(ChatMessage)
+
+
+def write_message(session, session_id: int, user_message: str, bot_response: str) -> None:
+    """
+    Insert a single chat message (commit it yourself, like bulk_insert_messages).
+    """
+    session.execute(INSERT_MESSAGE, {
+        "session_id": session_id,
+        "user_message": user_message,
+        "bot_response": bot_response,
+    })
+
+
+def bulk_insert_messages(session, rows: list[dict]) -> None:
+    """
+    Insert many chat messages with a single statement.
+    
+    Usage:
+        with get_session() as session:
+            bulk_insert_messages(session, [
+                {"session_id": 1, "user_message": "Hi", "bot_response": "Hello!"},
+                ...
+            ])
+            session.commit()
+    
+    Passing a LIST of dicts with an insert() makes SQLAlchemy send all rows
+    at once (executemany) instead of one INSERT per object - like
+    SqlBulkCopy instead of context.Add() in a loop in C#.
+    """
+    if rows:
+        session.execute(INSERT_MESSAGE, rows)
+
+
+def flush_buffered(messages: list[dict]) -> None:
+    """
+    Write a batch of chat messages in ONE transaction (one disk flush).
+    
+    On SQLite this goes straight to the driver: BEGIN IMMEDIATE takes the
+    write lock up front, executemany() inserts every row, COMMIT writes them
+    all at once. Other databases use bulk_insert_messages() instead.
+    
+    Args:
+        messages: dicts with session_id, user_message and bot_response
+    """
+    if not messages:
+        return
+    
+    if not IS_SQLITE:
+        with get_session() as session:
+            bulk_insert_messages(session, messages)
+            session.commit()
+        return
+    
+    rows = [(m["session_id"], m["user_message"], m["bot_response"]) for m in messages]
+    
+    with _sqlite_lock:  # Same turn-taking as get_session()
+        connection = engine.raw_connection()  # A plain sqlite3 connection from the pool
+        try:
+            cursor = connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.executemany(
+                    # timestamp given explicitly: tables created before it
+                    # had a server default don't fill it in (see models.py)
+                    "INSERT INTO chat_messages (session_id, user_message, bot_response, timestamp) "
+                    "VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+                    rows
+                )
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            finally:
+                cursor.close()
+        finally:
+            connection.close()  # Returns it to the pool (doesn't really close)
+
+
+# =============================================================================
+# BACKGROUND WRITER (messages are saved off the request thread)
+# =============================================================================
+#
+# Writing to the database means waiting for the disk. The user shouldn't have
+# to wait for that, so enqueue_message() just drops the message into a queue
+# and returns immediately. One dedicated "writer" thread takes messages out of
+# the queue and saves everything that has piled up with ONE commit.
+#
+# Only the writer thread writes chat messages, so request threads never queue
+# up behind each other for SQLite's write lock - they just read.
+#
+# This is the classic producer/consumer pattern - in C# you'd use a
+# BlockingCollection<T> or a Channel<T> with a single reader.
+#
+# Besides messages, the queue can hold "markers" (threading.Event objects,
+# like a ManualResetEvent in C#) put there by flush_pending_messages(). The
+# queue is first-in-first-out, so by the time the writer reaches a marker,
+# every message queued before it has been written - the writer then sets
+# the Event and whoever is waiting on it continues.
+#
+# The trade-off: if the process is killed, messages still in the queue
+# are lost. (On a normal exit we wait for the queue to empty - see atexit.)
+# =============================================================================
+
+_write_queue: queue.Queue[dict | Event] = queue.Queue()
+
+
+def _save_batch(messages: list[dict]) -> None:
+    """Write messages in one transaction, falling back to one at a time."""
     try:
-        yield session  # Give it to the 'with' block
-    finally:
-        session.close()  # Always close when done (like Dispose())
+        # One transaction for the whole batch (see flush_buffered)
+        flush_buffered(messages)
+        return
+    except Exception as error:
+        if len(messages) == 1:
+            print(f"Failed to save chat message for session {messages[0]['session_id']}: {error}")
+            return
+    
+    # One bad message (e.g. for a session that no longer exists) rolls back
+    # the whole batch - retry them one by one so only the bad ones are lost
+    for message in messages:
+        _save_batch([message])
+
+
+def _writer_loop() -> None:
+    """Save queued messages in batches, forever (runs on a background thread)."""
+    while True:
+        batch = [_write_queue.get()]  # Blocks (waits) until there's a message
+        
+        # Grab whatever else is already waiting, without blocking
+        while len(batch) < config.WRITE_BATCH_MAX:
+            try:
+                batch.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        # isinstance() is like C#'s 'is' operator
+        markers = [item for item in batch if isinstance(item, Event)]
+        messages = [item for item in batch if not isinstance(item, Event)]
+        
+        try:
+            _save_batch(messages)
+        except Exception as error:
+            # Don't let anything unexpected kill the writer thread
+            print(f"Failed to save {len(messages)} chat message(s): {error}")
+        finally:
+            for marker in markers:
+                marker.set()  # Wakes up the flush_pending_messages() call waiting on it
+
+
+Thread(target=_writer_loop, daemon=True).start()
+
+
+def enqueue_message(session_id: int, user_message: str, bot_response: str) -> None:
+    """Queue a message exchange for the background writer (returns immediately)."""
+    _write_queue.put(dict(
+        session_id=session_id,
+        user_message=user_message,
+        bot_response=bot_response
+    ))
+
+
+def _holds_session() -> bool:
+    """True if this thread is inside a get_session() block."""
+    # registry.has() checks without creating a session for this thread
+    return SessionLocal.registry.has() and SessionLocal().info.get("depth", 0) > 0
+
+
+def flush_pending_messages() -> None:
+    """
+    Wait until every message queued BEFORE this call has been written.
+    
+    Messages other threads queue while we wait don't make us wait longer.
+    
+    Raises:
+        RuntimeError: if called inside get_session() on SQLite - the writer
+            thread needs _sqlite_lock, which this thread is holding, so
+            waiting for it would hang forever (a deadlock).
+    """
+    if IS_SQLITE and _holds_session():
+        raise RuntimeError(
+            "flush_pending_messages() called inside get_session(); "
+            "call it before opening the session"
+        )
+    
+    marker = Event()
+    _write_queue.put(marker)
+    marker.wait()
+
+
+# Write whatever is left when the app exits (like AppDomain.ProcessExit in C#)
+atexit.register(flush_pending_messages)
+
+
+# =============================================================================
+# READING HISTORY (plain rows, no ORM objects)
+# =============================================================================
+
+def fetch_history(session, session_id: int, limit: int | None = 200) -> list:
+    """
+    Get a session's messages as lightweight rows, oldest first.
+    
+    Each row is a named tuple: (user_message, bot_response, timestamp).
+    Selecting columns instead of ChatMessage objects means SQLAlchemy doesn't
+    build, track and later clean up a full object per message - roughly a
+    small tuple per row instead of an object plus its bookkeeping.
+    
+    Args:
+        session: An open database session (from get_session())
+        session_id: The chat session to read
+        limit: At most this many messages - the most RECENT ones
+               (None = all of them)
+    """
+    query = (
+        select(ChatMessage.user_message, ChatMessage.bot_response, ChatMessage.timestamp)
+        .where(ChatMessage.session_id == session_id)
+    )
+    
+    if limit is None:
+        # Timestamps are whole seconds, so id breaks ties (insertion order)
+        query = query.order_by(ChatMessage.timestamp, ChatMessage.id)
+        return session.execute(query).all()  # Execute query and get all results (like .ToList())
+    
+    # Newest first, so LIMIT keeps the latest messages (like
+    # .OrderByDescending(...).Take(limit) in C#), then flip back to oldest first.
+    # The (session_id, timestamp) index works just as well read backwards.
+    query = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(limit)
+    rows = session.execute(query).all()
+    rows.reverse()  # In place, like List<T>.Reverse() in C#
+    return rows
+
+
+# =============================================================================
+# COMPILED SQL CACHE
+# =============================================================================
+
+def clear_compile_cache() -> None:
+    """
+    Empty the engine's cache of compiled SQL statements.
+    
+    Useful after one-off work (like init_db's table creation) whose
+    statements will never run again. The cache refills itself as queries run.
+    """
+    # _compiled_cache is "private" (leading underscore) - SQLAlchemy has no
+    # public method for this. It's None when caching is switched off.
+    if engine._compiled_cache is not None:
+        engine._compiled_cache.clear()
 
 
 # =============================================================================
 # DATABASE INITIALIZATION
 # =============================================================================
 
+def _schema_is_complete() -> bool:
+    """Check (SQLite only) whether every table and index already exists."""
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")
+        )
+        existing = {row[0] for row in rows}  # A set comprehension (like a HashSet<string>)
+    
+    expected = set(Base.metadata.tables)
+    expected |= {index.name for table in Base.metadata.sorted_tables for index in table.indexes}
+    
+    # a <= b on sets means "a is a subset of b" (like a.IsSubsetOf(b) in C#)
+    return expected <= existing
+
+
 def init_db() -> None:
     """
     Create all database tables.
@@ -162,11 +597,35 @@ def init_db() -> None:
     NOTE: This is simple for development. For production, you'd typically use
     Alembic (Python's migration tool, like EF Migrations) for proper versioning.
     """
-    # Import models here to ensure they're registered with Base
-    # (They were already imported at the top, but this makes it explicit)
-    import models  # noqa: F401 (tells linters: yes, this import is intentional)
+    # No need to import the models here: 'from models import Base, ChatMessage'
+    # at the top already ran models.py, which registered every table with Base
+    
+    # SQLAlchemy finishes setting up the models (resolving relationships like
+    # "ChatMessage" given as strings) the first time they're used - under a
+    # lock, so the first few requests would wait on each other. Do it now.
+    configure_mappers()
+    
+    # Quick check first: on SQLite, ONE query against sqlite_master (SQLite's
+    # own list of tables and indexes) tells us if everything already exists -
+    # the usual case on every restart. Otherwise create_all() and the index
+    # checks below ask about each table and index separately.
+    if IS_SQLITE and _schema_is_complete():
+        print("Database initialized! All tables already exist.")
+        return
     
     Base.metadata.create_all(bind=engine)
+    
+    # create_all() skips tables that already exist - including any index that
+    # was added to them later (like the (session_id, timestamp) index on
+    # chat_messages). So make sure every index exists: checkfirst=True is
+    # "CREATE INDEX IF NOT EXISTS".
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
+    # The CREATE statements above won't be needed again
+    clear_compile_cache()
+    
     print("Database initialized! Tables created if they didn't exist.")
 
 
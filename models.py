@@ -14,7 +14,7 @@ It's like Entity Framework in C#/.NET!
     DbSet<T>                     |    session.query(T)
     [Table("Name")]              |    __tablename__ = "name"
     [Key]                        |    primary_key=True
-    [Required]                   |    nullable=False
+    [Required]                   |    Mapped[str] (non-Optional)
     [ForeignKey]                 |    ForeignKey("table.column")
     Navigation Properties        |    relationship()
     .Include()                   |    .options(joinedload())
@@ -44,26 +44,31 @@ KEY PYTHON CONCEPTS IN THIS FILE
    - def method(self, arg): is like public void Method(arg)
 """
 
-from datetime import datetime, UTC  # UTC replaces deprecated utcnow
-from typing import Optional  # For nullable types
+from datetime import datetime
 
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy import String, ForeignKey, Index
+from sqlalchemy.sql import func  # SQL functions, e.g. func.now() -> CURRENT_TIMESTAMP
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+
+import config  # For MAX_MESSAGE_CHARS
 
 # =============================================================================
 # BASE CLASS
 # =============================================================================
 #
-# declarative_base() creates a base class that all our models inherit from.
+# DeclarativeBase is the SQLAlchemy 2.0 base class; we subclass it once and
+# all our models inherit from that.
 # This is like having a base DbEntity class in Entity Framework.
 #
 # In C# terms:
 #     public abstract class DbEntity { }  // All entities inherit from this
 #
 # SQLAlchemy uses this to know which classes are database tables.
+# ('pass' is Python's empty body, like {} in C#)
 # =============================================================================
 
-Base = declarative_base()
+class Base(DeclarativeBase):
+    pass
 
 
 # =============================================================================
@@ -96,23 +101,38 @@ class ChatSession(Base):
     # COLUMN DEFINITIONS
     # -------------------------------------------------------------------------
     #
-    # SQLAlchemy columns use Column() to define database columns.
-    # The pattern is: column_name = Column(Type, constraints...)
+    # SQLAlchemy 2.0 columns are TYPED attributes:
+    # The pattern is: column_name: Mapped[python_type] = mapped_column(constraints...)
+    #
+    # Mapped[int] tells SQLAlchemy (and your editor) the Python type, and
+    # SQLAlchemy picks the SQL type from it (int -> INTEGER, str -> VARCHAR,
+    # datetime -> DATETIME). Columns are NOT NULL unless the type is Optional[...].
     #
     # Compare to C# EF:
     #     [Key, DatabaseGenerated(DatabaseGeneratedOption.Identity)]
     #     public int Id { get; set; }
     #
     # Becomes:
-    #     id = Column(Integer, primary_key=True)
+    #     id: Mapped[int] = mapped_column(primary_key=True)
     # -------------------------------------------------------------------------
     
-    id = Column(Integer, primary_key=True)  # Auto-increment by default in SQLite
+    id: Mapped[int] = mapped_column(primary_key=True)  # Auto-increment by default in SQLite
     
-    created_at = Column(
-        DateTime, 
-        default=lambda: datetime.now(UTC),  # Default value (like = DateTime.UtcNow)
-        nullable=False
+    # The DATABASE works out the time (CURRENT_TIMESTAMP, in UTC), so Python
+    # doesn't build a datetime for every INSERT.
+    # Like in EF: .HasDefaultValueSql("CURRENT_TIMESTAMP")
+    # (SQLite's CURRENT_TIMESTAMP has whole-second precision, so queries
+    # that need exact order also sort by id)
+    #
+    # Why both?
+    # - server_default puts DEFAULT CURRENT_TIMESTAMP in the table definition
+    #   (only for tables created from now on).
+    # - default= makes SQLAlchemy write CURRENT_TIMESTAMP into every INSERT,
+    #   so databases created before - whose NOT NULL column has no default -
+    #   keep working.
+    created_at: Mapped[datetime] = mapped_column(
+        default=func.now(),
+        server_default=func.now()
     )
     
     # -------------------------------------------------------------------------
@@ -122,16 +142,29 @@ class ChatSession(Base):
     # This creates a navigation property to related ChatMessage objects.
     # 
     # In C# EF: public virtual ICollection<ChatMessage> Messages { get; set; }
+    # Mapped[list["ChatMessage"]] says it's a list; the quotes let us name
+    # ChatMessage before it's defined further down.
     #
     # 'back_populates' creates a two-way relationship (like EF navigation props)
     # It means: "ChatMessage has a 'session' property that points back to me"
+    #
+    # lazy="selectin" is eager loading, like .Include(s => s.Messages) in EF:
+    # loading N sessions runs ONE more query (WHERE session_id IN (...))
+    # instead of one query per session when .messages is first touched
+    # (the classic "N+1 queries" problem).
+    #
+    # Deleting: because of selectin, a loaded session always has its messages
+    # loaded too, so db.delete(session) still sends one DELETE per message.
+    # Use chat_repository.delete_session() instead - one DELETE, and the
+    # database removes the messages (ON DELETE CASCADE, see ChatMessage).
     # -------------------------------------------------------------------------
     
-    messages = relationship(
-        "ChatMessage",           # The related class name (as string to avoid circular imports)
+    messages: Mapped[list["ChatMessage"]] = relationship(
         back_populates="session", # The property on ChatMessage that references this; remove back_populates if you don't need bidirectional navigation
         cascade="all, delete-orphan",  # Delete messages when session is deleted
-        order_by="ChatMessage.timestamp"  # Always return messages in order
+        passive_deletes=True,  # ...but let the DATABASE delete any not loaded yet (ON DELETE CASCADE)
+        order_by="[ChatMessage.timestamp, ChatMessage.id]",  # Always return messages in order
+        lazy="selectin"  # Load messages for ALL fetched sessions in one extra query
     )
     
     # -------------------------------------------------------------------------
@@ -180,26 +213,41 @@ class ChatMessage(Base):
     
     __tablename__ = "chat_messages"
     
-    id = Column(Integer, primary_key=True)
+    # __table_args__ holds extra table-level settings, like indexes
+    # Loading a session's history filters on session_id and sorts by timestamp;
+    # this index lets SQLite read the rows already in that order (no sorting).
+    # Like in EF: modelBuilder.Entity<ChatMessage>().HasIndex(m => new { m.SessionId, m.Timestamp });
+    __table_args__ = (
+        Index("ix_chat_messages_session_ts", "session_id", "timestamp"),
+    )
+    
+    id: Mapped[int] = mapped_column(primary_key=True)
     
     # Foreign Key to ChatSession
     # ForeignKey("table_name.column_name") references the parent table
-    session_id = Column(
-        Integer, 
-        ForeignKey("chat_sessions.id"),  # References chat_sessions.id
-        nullable=False
+    session_id: Mapped[int] = mapped_column(
+        # ondelete="CASCADE": deleting a session makes the database delete its
+        # messages itself, in one go (like .OnDelete(DeleteBehavior.Cascade) in EF)
+        # (Only tables created since this was added have it - create_all()
+        # never changes an existing table. Recreate older databases for it.)
+        ForeignKey("chat_sessions.id", ondelete="CASCADE")  # References chat_sessions.id
     )
     
     # Text columns for the messages
-    # Text is for longer strings (like nvarchar(max) in SQL Server)
-    # String(255) would be like nvarchar(255)
-    user_message = Column(Text, nullable=False)
-    bot_response = Column(Text, nullable=False)
-    
-    timestamp = Column(
-        DateTime, 
-        default=lambda: datetime.now(UTC), 
-        nullable=False
+    # String(N) has a declared maximum length (like nvarchar(8192) in SQL Server)
+    # Text would be unbounded (like nvarchar(max)); a limit lets databases
+    # that honour it store the values more compactly. It's safe because both
+    # sides are kept short BEFORE they get here: the bot's replies are capped
+    # at MAX_NEW_TOKENS, and user messages at MAX_MESSAGE_CHARS (the chat
+    # textbox's max_length, and save_message() truncates as a backstop).
+    # (SQLite stores both the same way and doesn't enforce the length)
+    user_message: Mapped[str] = mapped_column(String(config.MAX_MESSAGE_CHARS))
+    bot_response: Mapped[str] = mapped_column(String(config.MAX_MESSAGE_CHARS))
+    
+    # Filled in by the database (see ChatSession for why there are two defaults)
+    timestamp: Mapped[datetime] = mapped_column(
+        default=func.now(),
+        server_default=func.now()
     )
     
     # -------------------------------------------------------------------------
@@ -210,12 +258,17 @@ class ChatMessage(Base):
     # In C#: public virtual ChatSession Session { get; set; }
     # -------------------------------------------------------------------------
     
-    session = relationship("ChatSession", back_populates="messages")
+    session: Mapped["ChatSession"] = relationship(back_populates="messages")
     
     def __repr__(self) -> str:
         # Truncate long messages for readability (like string.Substring in C#)
-        user_preview = self.user_message[:30] + "..." if len(self.user_message) > 30 else self.user_message
-        return f"<ChatMessage(id={self.id}, user='{user_preview}')>"
+        # Slice FIRST, so the work is the same for a 10-character message and
+        # a 10,000-character one; 31 characters tell us if there was more.
+        # ('or ""' covers a message that hasn't been set yet, i.e. None)
+        user_preview = (self.user_message or "")[:31]
+        if len(user_preview) > 30:
+            user_preview = user_preview[:30] + "..."
+        return f"<ChatMessage(id={self.id}, user={user_preview!r})>"
 
 
 # =============================================================================